@@ -2,16 +2,59 @@
 # -*- coding: utf-8 -*-
 
 import os
+import random
 import asyncio
 import aiohttp
 import base64
+import hashlib
 import json
+import atexit
 import logging
+import logging.handlers
+import queue
+import re
 import sqlite3
 import time
 import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+# uvloop (optional): более быстрый event loop вместо стандартного selector loop
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# orjson (optional): разбор JSON-ответов API в 2-5 раз быстрее стандартного json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# предупреждения о некорректных переменных окружения: логирование ещё не настроено,
+# поэтому они копятся здесь и выводятся сразу после настройки логгера
+_env_warnings = []
+
+def env_int(name: str, default: int, minimum: int = None) -> int:
+    """
+    Целое из переменной окружения. Пусто — default; не число — default с предупреждением;
+    меньше minimum — minimum с предупреждением.
+    """
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        _env_warnings.append(f"{name}={raw!r} is not an integer, using {default}")
+        return default
+    if minimum is not None and value < minimum:
+        _env_warnings.append(f"{name}={value} is below {minimum}, using {minimum}")
+        return minimum
+    return value
+
 # ---------- Конфигурация ----------
 BASE_DIR = os.getcwd()
 DB_PATH = os.path.join(BASE_DIR, "news.db")
@@ -22,17 +65,105 @@ YANDEX_API_KEY = os.getenv("YANDEX_API_KEY", "")
 YANDEX_FOLDER_ID = os.getenv("YANDEX_FOLDER_ID", "")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+# > 0 — режим демона: обрабатывать по статье каждые N секунд, не завершая процесс (0 — один запуск)
+HANDLER_LOOP_INTERVAL = env_int("HANDLER_LOOP_INTERVAL", 0, minimum=0)
+# сколько статей обрабатывать за запуск/цикл (генерация параллельно, отправка по очереди)
+HANDLER_BATCH_SIZE = env_int("HANDLER_BATCH_SIZE", 1, minimum=1)
+
+# HTTP: одна сессия (и пул keep-alive соединений) на запуск для YandexGPT, YandexART и Telegram.
+# На каждую статью пачки одновременно идут два запроса к llm.api.cloud.yandex.net (GPT и ART),
+# плюс соединение с api.telegram.org. Пул должен вмещать их все: total-таймаут aiohttp включает
+# ожидание свободного соединения, и запрос в очереди к пулу тратил бы на это свои GPT_TIMEOUT и повторы
+HTTP_POOL_LIMIT_PER_HOST = max(4, 2 * HANDLER_BATCH_SIZE)
+HTTP_POOL_LIMIT = HTTP_POOL_LIMIT_PER_HOST + 4
+HTTP_DNS_CACHE_TTL = 600  # seconds
+# соединение с Telegram, прогретое в начале, должно пережить генерацию пересказа и картинки
+HTTP_KEEPALIVE_TIMEOUT = 120  # seconds
+# таймауты сессии по умолчанию; у отдельных запросов (GPT, ART, Telegram) свои total
+HTTP_SESSION_TIMEOUT = aiohttp.ClientTimeout(total=120, sock_connect=10, sock_read=90)
+# таймауты отдельных запросов (объекты создаются один раз, а не на каждый запрос)
+WARMUP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+GPT_TIMEOUT = aiohttp.ClientTimeout(total=90)
+ART_START_TIMEOUT = aiohttp.ClientTimeout(total=120)
+ART_POLL_TIMEOUT = aiohttp.ClientTimeout(total=30)
+TG_PHOTO_TIMEOUT = aiohttp.ClientTimeout(total=30)
+TG_TEXT_TIMEOUT = aiohttp.ClientTimeout(total=20)
+
+# лимиты Telegram Bot API: текст сообщения и подпись к фото
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_CAPTION_LIMIT = 1024
+
+# повторы запросов к YandexGPT и Telegram при ограничении частоты (429) и сбоях на стороне сервера (5xx)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 4
+RETRY_MAX_DELAY = 30  # seconds
+# сетевые сбои, после которых запрос повторяем. Для GPT — и таймаут, и обрыв: повтор стоит лишь
+# лишнего запроса. Для Telegram — только неудачное подключение: если сервер успел получить
+# сообщение, а ответ потерялся, повтор опубликовал бы его дважды
+GPT_RETRY_EXCEPTIONS = (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError, asyncio.TimeoutError)
+TELEGRAM_RETRY_EXCEPTIONS = (aiohttp.ClientConnectorError,)
+
+# кэш ответов YandexGPT в news.db: повторный запуск по той же статье (например, перезапуск workflow
+# после неудачной отправки) берёт готовый пересказ вместо нового платного запроса
+GPT_CACHE_TTL = env_int("GPT_CACHE_TTL", 3600, minimum=0)  # seconds; 0 — кэш не используется
+
+# Пересказ от GPT: блок от "🚀" (заголовок) до строки с хештегами "🔖" включительно (и строк "#тег"
+# сразу за ней, если модель перенесла теги) — без вступлений и комментариев модели до/после;
+# подряд идущие пустые строки схлопываются в одну
+_SUMMARY_RE = re.compile(r"🚀(?:.*🔖[^\n]*(?:\n[ \t]*#[^\n]*)*|.*)", re.DOTALL)
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
+# json.loads принимает и bytes, так что ответ читаем через resp.read() в обоих случаях
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Промпт пересказа статьи (подставляется link)
+ARTICLE_PROMPT_TEMPLATE = """
+ЗАДАЧА: Перевести на русский и создать краткий пересказ новости: {link}
+
+ТРЕБОВАНИЯ:
+1. Заголовок: краткий, привлекающий внимание
+2. Текст: 5-7 предложений, только ключевые факты
+3. Вывод: практическая польза (1 предложение)
+4. Ссылка: оригинальный URL
+5. Хештеги: 3 релевантных тега (русский)
+
+ФОРМАТ:
+🚀 <Заголовок>
+
+📝 <5-7 предложений>
+
+💡 <Польза>
+
+🔗 {link}
+
+🔖 #тег1 #тег2 #тег3
+"""
+
+# модели и системное сообщение YandexGPT
+GPT_MODEL = "yandexgpt-lite"
+ART_MODEL = "yandex-art/latest"
+_SYSTEM_TEXT = "Ты — профессиональный редактор AI-новостей."
+
+# маркеры в заранее сериализованном теле запроса к YandexGPT
+_PROMPT_MARK = "<<PROMPT>>"
+_MAX_TOKENS_MARK = "<<MAX_TOKENS>>"
 
 # ---------- Логирование ----------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+# запись в файл/консоль идёт в фоновом потоке QueueListener, event loop только кладёт записи в очередь
+_log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+_log_handlers = [logging.FileHandler(LOG_FILE, encoding="utf-8"), logging.StreamHandler()]
+for _h in _log_handlers:
+    _h.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # asctime/level добавят обработчики listener-а
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 logger = logging.getLogger("news-handler")
+for _warning in _env_warnings:
+    logger.warning(_warning)
 
 # ---------- Утилиты ----------
 def estimate_tokens(text: str) -> int:
@@ -40,246 +171,453 @@ def estimate_tokens(text: str) -> int:
         return 1
     return max(1, math.ceil(len(text) / 4.0))
 
+def make_session() -> aiohttp.ClientSession:
+    """
+    Одна сессия на GPT, ART и Telegram: TCP+TLS рукопожатие и DNS на каждый хост — один раз
+    за запуск (в режиме демона — на всё время работы).
+    """
+    connector = aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                                     use_dns_cache=True, ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                                     keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=HTTP_SESSION_TIMEOUT)
+
+def clean_summary(text: str) -> str:
+    m = _SUMMARY_RE.search(text)
+    block = m.group(0) if m else text
+    return _BLANK_LINES_RE.sub("\n\n", block).strip()
+
+async def warm_up_connection(session: aiohttp.ClientSession, url: str):
+    """
+    Прогрев соединения: HEAD открывает TCP+TLS к хосту заранее, и настоящий запрос берёт готовое
+    keep-alive соединение из пула сессии. Ошибки не важны — прогрев необязателен.
+    """
+    try:
+        async with session.head(url, allow_redirects=False, timeout=WARMUP_TIMEOUT):
+            pass
+    except Exception as e:
+        logger.debug("Connection warm-up failed (%s)", type(e).__name__)
+
+def retry_delay(attempt: int, retry_after: str = None) -> float:
+    """
+    Пауза перед повтором: Retry-After от сервера, если есть, иначе экспонента 1, 2, 4... с джиттером
+    (чтобы повторы не приходили пачкой). Не больше RETRY_MAX_DELAY.
+    """
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return min(RETRY_MAX_DELAY, 2 ** attempt + random.random())
+
 async def send_photo_to_telegram(image_bytes: bytes, caption: str, token: str, chat_id: str, session: aiohttp.ClientSession):
     url = f"https://api.telegram.org/bot{token}/sendPhoto"
-    form = aiohttp.FormData()
-    form.add_field("chat_id", chat_id)
-    form.add_field("photo", image_bytes, filename="news.jpg", content_type="image/jpeg")
-    form.add_field("caption", caption)
-    form.add_field("parse_mode", "HTML")
-    try:
-        async with session.post(url, data=form, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-            text = await resp.text()
-            if resp.status == 200:
-                logger.info("Telegram photo sent")
-                return True
-            else:
-                logger.error(f"Telegram sendPhoto failed: {resp.status} {text}")
+    for attempt in range(RETRY_ATTEMPTS):
+        # FormData одноразовая — собираем заново на каждую попытку
+        form = aiohttp.FormData()
+        form.add_field("chat_id", chat_id)
+        form.add_field("photo", image_bytes, filename="news.jpg", content_type="image/jpeg")
+        form.add_field("caption", caption)
+        form.add_field("parse_mode", "HTML")
+        try:
+            async with session.post(url, data=form, timeout=TG_PHOTO_TIMEOUT) as resp:
+                body = await resp.read()
+                if resp.status == 200:
+                    logger.info("Telegram photo sent")
+                    return True
+                if resp.status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS - 1:
+                    logger.error("Telegram sendPhoto failed: %s %s", resp.status, body.decode('utf-8', 'replace'))
+                    return False
+                delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+                logger.warning("Telegram sendPhoto %s, retry in %.1fs", resp.status, delay)
+        except TELEGRAM_RETRY_EXCEPTIONS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                logger.error("Telegram sendPhoto exception: %s", e)
                 return False
-    except Exception as e:
-        logger.error(f"Telegram sendPhoto exception: {e}")
-        return False
+            delay = retry_delay(attempt)
+            logger.warning("Telegram sendPhoto connection failed (%s), retry in %.1fs", e, delay)
+        except Exception as e:
+            logger.error("Telegram sendPhoto exception: %s", e)
+            return False
+        await asyncio.sleep(delay)
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT):
+    """
+    Делит текст на части не длиннее limit: по абзацам (пустая строка), абзац длиннее limit — по строкам,
+    строка длиннее limit — жёстко. Telegram отклоняет сообщения длиннее 4096 символов (400).
+    """
+    if len(text) <= limit:
+        return [text]
+    parts, current = [], ""
+    for para in text.split("\n\n"):
+        if len(para) <= limit:
+            pieces = [para]
+        else:
+            pieces = [line[i:i + limit] for line in para.split("\n") for i in range(0, max(len(line), 1), limit)]
+        for n, piece in enumerate(pieces):
+            sep = "\n\n" if n == 0 else "\n"
+            if current and len(current) + len(sep) + len(piece) <= limit:
+                current += sep + piece
+            else:
+                if current:
+                    parts.append(current)
+                current = piece
+    if current:
+        parts.append(current)
+    return parts
 
 async def send_text_to_telegram(text: str, token: str, chat_id: str, session: aiohttp.ClientSession):
+    parts = split_message(text)
+    if len(parts) > 1:
+        logger.info("Telegram message is %s chars, sending in %s parts", len(text), len(parts))
+    for part in parts:
+        if not await _send_message_part(part, token, chat_id, session):
+            return False
+    return True
+
+async def _send_message_part(text: str, token: str, chat_id: str, session: aiohttp.ClientSession):
     url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
-    try:
-        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=20)) as resp:
-            text_resp = await resp.text()
-            if resp.status == 200:
-                logger.info("Telegram text sent")
-                return True
-            else:
-                logger.error(f"Telegram sendMessage failed: {resp.status} {text_resp}")
+    # form-urlencoded (формат Bot API по умолчанию) вместо JSON
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": "true"}
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            async with session.post(url, data=payload, timeout=TG_TEXT_TIMEOUT) as resp:
+                body = await resp.read()
+                if resp.status == 200:
+                    logger.info("Telegram text sent")
+                    return True
+                if resp.status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS - 1:
+                    logger.error("Telegram sendMessage failed: %s %s", resp.status, body.decode('utf-8', 'replace'))
+                    return False
+                delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+                logger.warning("Telegram sendMessage %s, retry in %.1fs", resp.status, delay)
+        except TELEGRAM_RETRY_EXCEPTIONS as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                logger.error("Telegram sendText exception: %s", e)
                 return False
-    except Exception as e:
-        logger.error(f"Telegram sendText exception: {e}")
-        return False
+            delay = retry_delay(attempt)
+            logger.warning("Telegram sendMessage connection failed (%s), retry in %.1fs", e, delay)
+        except Exception as e:
+            logger.error("Telegram sendText exception: %s", e)
+            return False
+        await asyncio.sleep(delay)
 
 # ---------- Yandex clients (async) ----------
 class AsyncYandexGPTMonitor:
-    def __init__(self, api_key: str, folder_id: str):
+    def __init__(self, api_key: str, folder_id: str, session: aiohttp.ClientSession,
+                 cache_conn: sqlite3.Connection = None):
         self.api_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
         self.headers = {"Authorization": f"Api-Key {api_key}", "Content-Type": "application/json"}
         self.folder_id = folder_id
-        self.session = None
+        # заголовок "Api-Key ..." непуст даже без ключа — проверяем сами значения
+        self.configured = bool(api_key and folder_id)
+        # общая сессия вызывающего кода (make_session): один пул соединений на GPT, ART и Telegram
+        self.session = session
+        # соединение с БД для кэша ответов (gpt_cache); None — без кэша
+        self.cache_conn = cache_conn
         self.token_usage = 0
-
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        if self.session:
-            await self.session.close()
+        # тело запроса сериализуем один раз; от вызова к вызову меняются только промпт и maxTokens,
+        # их подставляем на место маркеров
+        self._body_template = json.dumps({
+            "modelUri": f"gpt://{folder_id}/{GPT_MODEL}",
+            "completionOptions": {"stream": False, "temperature": 0.7, "maxTokens": _MAX_TOKENS_MARK},
+            "messages": [
+                {"role": "system", "text": _SYSTEM_TEXT},
+                {"role": "user", "text": _PROMPT_MARK}
+            ]
+        }, ensure_ascii=False)
 
     async def yandex_gpt_call(self, prompt: str, max_tokens: int = 2000):
-        if not self.headers["Authorization"] or not self.folder_id:
+        if not self.configured:
             logger.error("Yandex GPT key/folder missing")
             return None
-        data = {
-            "modelUri": f"gpt://{self.folder_id}/yandexgpt-lite",
-            "completionOptions": {"stream": False, "temperature": 0.7, "maxTokens": max_tokens},
-            "messages": [
-                {"role": "system", "text": "Ты — профессиональный редактор AI-новостей."},
-                {"role": "user", "text": prompt}
-            ]
-        }
-        try:
-            async with self.session.post(self.api_url, headers=self.headers, json=data, timeout=aiohttp.ClientTimeout(total=90)) as resp:
-                if resp.status == 200:
-                    res = await resp.json()
-                    try:
-                        content = res['result']['alternatives'][0]['message']['text']
-                    except Exception:
-                        content = json.dumps(res)[:1000]
-                    estimated_tokens = (len(content) + len(prompt)) // 4
-                    self.token_usage += estimated_tokens
-                    logger.info(f"YandexGPT OK (~{estimated_tokens} tokens)")
-                    return content
-                else:
-                    text = await resp.text()
-                    logger.error(f"YandexGPT error: {resp.status} {text}")
+        # сначала число, потом промпт: маркер внутри текста промпта после json.dumps экранирован и не совпадёт
+        body = (self._body_template
+                .replace(json.dumps(_MAX_TOKENS_MARK), str(int(max_tokens)))
+                .replace(json.dumps(_PROMPT_MARK), json.dumps(prompt, ensure_ascii=False))
+                .encode("utf-8"))
+        cache_key = None
+        if self.cache_conn is not None:
+            # ключ — тело запроса целиком (модель, параметры, сообщения); таймауты в него не входят
+            cache_key = hashlib.sha256(body).hexdigest()
+            cached = await run_db(gpt_cache_get, self.cache_conn, cache_key, GPT_CACHE_TTL)
+            if cached is not None:
+                logger.info("YandexGPT cache hit")
+                return cached
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                async with self.session.post(self.api_url, headers=self.headers, data=body, timeout=GPT_TIMEOUT) as resp:
+                    if resp.status == 200:
+                        res = _json_loads(await resp.read())
+                        try:
+                            content = res['result']['alternatives'][0]['message']['text']
+                        except Exception:
+                            content = json.dumps(res)[:1000]
+                        # точное число токенов API отдаёт в result.usage.totalTokens (строкой); оценка — только если его нет
+                        try:
+                            tokens = int(res['result']['usage']['totalTokens'])
+                        except Exception:
+                            tokens = (len(content) + len(prompt)) // 4
+                        self.token_usage += tokens
+                        logger.info("YandexGPT OK (%s tokens)", tokens)
+                        if cache_key:
+                            await run_db(gpt_cache_put, self.cache_conn, cache_key, content)
+                        return content
+                    # ответы Yandex всегда в UTF-8 - декодируем сами, без определения кодировки
+                    text = (await resp.read()).decode("utf-8", "replace")
+                    if resp.status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS - 1:
+                        logger.error("YandexGPT error: %s %s", resp.status, text)
+                        return None
+                    delay = retry_delay(attempt, resp.headers.get("Retry-After"))
+                    logger.warning("YandexGPT %s, retry in %.1fs", resp.status, delay)
+            except GPT_RETRY_EXCEPTIONS as e:
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+                if attempt == RETRY_ATTEMPTS - 1:
+                    logger.error("YandexGPT %s, giving up after %s attempts", reason, RETRY_ATTEMPTS)
                     return None
-        except asyncio.TimeoutError:
-            logger.error("YandexGPT timeout")
-            return None
-        except Exception as e:
-            logger.error(f"YandexGPT exception: {e}")
-            return None
+                delay = retry_delay(attempt)
+                logger.warning("YandexGPT %s, retry in %.1fs", reason, delay)
+            except Exception as e:
+                logger.error("YandexGPT exception: %s", e)
+                return None
+            await asyncio.sleep(delay)
 
 class AsyncYandexArtGenerator:
-    def __init__(self, api_key: str, folder_id: str):
+    def __init__(self, api_key: str, folder_id: str, session: aiohttp.ClientSession):
         self.api_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/imageGenerationAsync"
         self.headers = {"Authorization": f"Api-Key {api_key}", "Content-Type": "application/json"}
         self.folder_id = folder_id
-        self.session = None
-
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        if self.session:
-            await self.session.close()
+        self.configured = bool(api_key and folder_id)
+        # общая сессия вызывающего кода (make_session)
+        self.session = session
 
     async def generate_image(self, prompt: str, max_attempts: int = 30, delay: int = 4):
-        if not self.headers["Authorization"] or not self.folder_id:
+        if not self.configured:
             logger.warning("Yandex ART keys not set")
             return None
         data = {
-            "modelUri": f"art://{self.folder_id}/yandex-art/latest",
+            "modelUri": f"art://{self.folder_id}/{ART_MODEL}",
             "generationOptions": {"seed": int(time.time()) % 1000000},
             "messages": [{"weight": 1, "text": prompt}]
         }
         try:
-            async with self.session.post(self.api_url, headers=self.headers, json=data, timeout=aiohttp.ClientTimeout(total=120)) as resp:
+            async with self.session.post(self.api_url, headers=self.headers, json=data, timeout=ART_START_TIMEOUT) as resp:
                 if resp.status == 200:
-                    res = await resp.json()
+                    res = _json_loads(await resp.read())
                     task_id = res.get("id")
                     if not task_id:
                         logger.error("No task id from art start")
                         return None
                     for attempt in range(max_attempts):
                         check_url = f"https://llm.api.cloud.yandex.net/operations/{task_id}"
-                        async with self.session.get(check_url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=30)) as cresp:
+                        async with self.session.get(check_url, headers=self.headers, timeout=ART_POLL_TIMEOUT) as cresp:
                             if cresp.status == 200:
-                                cres = await cresp.json()
+                                # готовая операция несёт картинку в base64 (сотни КБ JSON) — разбор через orjson
+                                cres = _json_loads(await cresp.read())
                                 if cres.get("done"):
                                     try:
                                         image_b64 = cres['response']['image']
                                         img_bytes = base64.b64decode(image_b64)
-                                        logger.info(f"Art generated ({len(img_bytes)} bytes)")
+                                        logger.info("Art generated (%s bytes)", len(img_bytes))
                                         return img_bytes
                                     except Exception as e:
-                                        logger.error(f"Art decode error: {e}")
+                                        logger.error("Art decode error: %s", e)
                                         return None
                         await asyncio.sleep(delay)
                     logger.error("Art generation timed out")
                     return None
                 else:
-                    text = await resp.text()
-                    logger.error(f"Art start error: {resp.status} {text}")
+                    text = (await resp.read()).decode("utf-8", "replace")
+                    logger.error("Art start error: %s %s", resp.status, text)
                     return None
         except Exception as e:
-            logger.error(f"Art generation exception: {e}")
+            logger.error("Art generation exception: %s", e)
             return None
 
 # ---------- DB helpers ----------
-def get_next_article(conn: sqlite3.Connection):
+# все обращения к news.db (и чтения, и записи с commit/fsync) идут через один поток: соединение
+# создаётся и используется только в нём, event loop не блокируется, а запросы выполняются по очереди
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+async def run_db(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(DB_EXECUTOR, func, *args)
+
+def open_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    ensure_gpt_cache(conn)
+    return conn
+
+def get_next_articles(conn: sqlite3.Connection, limit: int = 1):
     cur = conn.cursor()
-    cur.execute("SELECT * FROM news WHERE status='new' ORDER BY pub_date ASC, parsed_date ASC LIMIT 1")
-    return cur.fetchone()
+    cur.execute("SELECT * FROM news WHERE status='new' ORDER BY pub_date ASC, parsed_date ASC LIMIT ?", (limit,))
+    return cur.fetchall()
 
 def mark_article_posted(conn: sqlite3.Connection, id_):
     cur = conn.cursor()
     cur.execute("UPDATE news SET status='posted' WHERE id = ?", (id_,))
     conn.commit()
 
-# ---------- Processing one article ----------
-async def process_one_article():
+def ensure_gpt_cache(conn: sqlite3.Connection, ttl: int = GPT_CACHE_TTL):
+    conn.execute("CREATE TABLE IF NOT EXISTS gpt_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, ts INTEGER NOT NULL)")
+    # устаревшие записи всё равно не будут выданы — удаляем, чтобы news.db (артефакт workflow) не рос
+    conn.execute("DELETE FROM gpt_cache WHERE ts < ?", (int(time.time()) - ttl,))
+    conn.commit()
+
+def gpt_cache_get(conn: sqlite3.Connection, key: str, ttl: int):
+    try:
+        row = conn.execute("SELECT response, ts FROM gpt_cache WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("GPT cache read failed: %s", e)
+        return None
+    if row and time.time() - row[1] < ttl:
+        return row[0]
+    return None
+
+def gpt_cache_put(conn: sqlite3.Connection, key: str, response: str):
+    try:
+        conn.execute("INSERT OR REPLACE INTO gpt_cache (key, response, ts) VALUES (?, ?, ?)",
+                     (key, response, int(time.time())))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning("GPT cache write failed: %s", e)
+
+# ---------- Processing articles ----------
+async def prepare_article(row: sqlite3.Row, session: aiohttp.ClientSession, conn: sqlite3.Connection):
+    """
+    Пересказ (YandexGPT) и картинка (YandexART) для одной статьи; картинка зависит только от заголовка,
+    поэтому генерируется параллельно с пересказом. None — GPT не вернул результат.
+    """
+    article_id = row["id"]
+    title = row["title"]
+    logger.info("Processing id=%s, site=%s, title=%s", article_id, row['site'], title[:100])
+
+    # GPT_CACHE_TTL=0 — кэш выключен: ответы не хэшируются и не записываются
+    gpt = AsyncYandexGPTMonitor(YANDEX_API_KEY, YANDEX_FOLDER_ID, session,
+                                cache_conn=conn if GPT_CACHE_TTL > 0 else None)
+    artgen = AsyncYandexArtGenerator(YANDEX_API_KEY, YANDEX_FOLDER_ID, session)
+
+    img_prompt = f"News illustration: {title}, digital art, modern news style, professional"
+    art_task = asyncio.create_task(artgen.generate_image(img_prompt))
+
+    summary = await gpt.yandex_gpt_call(ARTICLE_PROMPT_TEMPLATE.format(link=row["link"]))
+    if not summary:
+        logger.error("YandexGPT не вернул результат (id=%s)", article_id)
+        art_task.cancel()
+        return None
+    return {
+        "id": article_id,
+        "summary": clean_summary(summary),
+        "image": await art_task,
+        "tokens_used": gpt.token_usage,
+    }
+
+async def publish_article(article: dict, session: aiohttp.ClientSession) -> bool:
+    summary = article["summary"]
+    sent_ok = False
+    # подпись к фото ограничена 1024 символами — длинный пересказ сразу отправляем текстом
+    if article["image"] and len(summary) <= TELEGRAM_CAPTION_LIMIT:
+        sent_ok = await send_photo_to_telegram(article["image"], summary, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, session)
+    if not sent_ok:
+        sent_ok = await send_text_to_telegram(summary, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, session)
+    return sent_ok
+
+async def process_articles(session: aiohttp.ClientSession = None, limit: int = HANDLER_BATCH_SIZE):
+    """
+    Обрабатывает до limit самых старых новых статей: генерация (GPT + ART) для всех идёт параллельно,
+    отправка в Telegram — последовательно в порядке очереди. На первой неудаче отправка прекращается,
+    чтобы статьи не выходили вне очереди; оставшиеся подхватит следующий запуск
+    (пересказ — из gpt_cache, если GPT_CACHE_TTL > 0 и он ещё не истёк).
+    """
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         logger.error("Telegram TOKEN/CHAT not set in env")
         return {"ok": False, "reason": "telegram not set"}
+    # без ключа YandexGPT статью не обработать — выходим до БД и сети
+    if not YANDEX_API_KEY or not YANDEX_FOLDER_ID:
+        logger.error("YANDEX_API_KEY/YANDEX_FOLDER_ID not set in env")
+        return {"ok": False, "reason": "yandex not set"}
 
     if not os.path.exists(DB_PATH):
         logger.info("DB not found. Парсер, возможно, не запускался.")
         return {"ok": True, "sent": 0, "reason": "db missing"}
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-
-    row = get_next_article(conn)
-    if not row:
+    conn = await run_db(open_db)
+    rows = await run_db(get_next_articles, conn, limit)
+    if not rows:
         logger.info("Нет новых статей для отправки.")
-        conn.close()
+        await run_db(conn.close)
         return {"ok": True, "sent": 0}
 
-    article_id = row["id"]
-    site = row["site"]
-    title = row["title"]
-    link = row["link"]
-    pub_date = row["pub_date"]
-
-    logger.info(f"Processing id={article_id}, site={site}, title={title[:100]}")
-
-    prompt = f"""
-ЗАДАЧА: Перевести на русский и создать краткий пересказ новости: {link}
-
-ТРЕБОВАНИЯ:
-1. Заголовок: краткий, привлекающий внимание
-2. Текст: 5-7 предложений, только ключевые факты
-3. Вывод: практическая польза (1 предложение)
-4. Ссылка: оригинальный URL
-5. Хештеги: 3 релевантных тега (русский)
-
-ФОРМАТ:
-🚀 <Заголовок>
-
-📝 <5-7 предложений>
-
-💡 <Польза>
-
-🔗 {link}
-
-🔖 #тег1 #тег2 #тег3
-"""
-
-    # GPT
-    async with AsyncYandexGPTMonitor(YANDEX_API_KEY, YANDEX_FOLDER_ID) as gpt:
-        summary = await gpt.yandex_gpt_call(prompt)
-    if not summary:
-        logger.error("YandexGPT не вернул результат")
-        conn.close()
-        return {"ok": False, "reason": "gpt failed"}
-
-    # Image
-    img_prompt = f"News illustration: {title}, digital art, modern news style, professional"
-    async with AsyncYandexArtGenerator(YANDEX_API_KEY, YANDEX_FOLDER_ID) as artgen:
-        image_bytes = await artgen.generate_image(img_prompt)
-
-    # Send to Telegram
-    async with aiohttp.ClientSession() as session:
-        sent_ok = False
-        if image_bytes:
-            sent_ok = await send_photo_to_telegram(image_bytes, summary, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, session)
-        if not sent_ok:
-            sent_ok = await send_text_to_telegram(summary, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, session)
-
-    if sent_ok:
-        mark_article_posted(conn, article_id)
-        tokens_est = estimate_tokens(summary)
-        logger.info(f"Posted id={article_id}. Tokens est: ~{tokens_est}")
-        conn.close()
-        return {"ok": True, "sent": 1, "id": article_id, "tokens_est": tokens_est}
+    # сессия вызывающего кода (режим демона) или своя на этот запуск
+    own_session = session is None
+    if own_session:
+        session = make_session()
+    posted = []
+    reason = None
+    try:
+        # соединение с Telegram открываем, пока идёт генерация (соединение с Yandex откроет сам запрос к GPT)
+        warmup = asyncio.create_task(warm_up_connection(session, f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getMe"))
+        prepared = await asyncio.gather(*(prepare_article(row, session, conn) for row in rows))
+        await warmup
+
+        # Send to Telegram
+        for article in prepared:
+            if article is None:
+                reason = "gpt failed"
+                break
+            if not await publish_article(article, session):
+                logger.error("Failed to send to Telegram")
+                reason = "send failed"
+                break
+            await run_db(mark_article_posted, conn, article["id"])
+            posted.append(article)
+            logger.info("Posted id=%s. Tokens used: %s (summary est: ~%s)",
+                        article["id"], article["tokens_used"], estimate_tokens(article["summary"]))
+    finally:
+        if own_session:
+            await session.close()
+        await run_db(conn.close)
+
+    if not posted:
+        return {"ok": False, "reason": reason}
+    res = {
+        "ok": reason is None,
+        "sent": len(posted),
+        "tokens_est": sum(estimate_tokens(a["summary"]) for a in posted),
+        "tokens_used": sum(a["tokens_used"] for a in posted),
+    }
+    if len(posted) == 1:
+        res["id"] = posted[0]["id"]
     else:
-        logger.error("Failed to send to Telegram")
-        conn.close()
-        return {"ok": False, "reason": "send failed"}
+        res["ids"] = [a["id"] for a in posted]
+    if reason:
+        res["reason"] = reason
+    return res
+
+async def run_forever(interval: int):
+    """
+    Режим демона: процесс, сессия и её keep-alive соединения живут между циклами,
+    так что каждый цикл не платит за старт интерпретатора, импорты и TLS.
+    """
+    logger.info("Handler loop mode: up to %s article(s) every %ss", HANDLER_BATCH_SIZE, interval)
+    async with make_session() as session:
+        while True:
+            try:
+                res = await process_articles(session)
+                logger.info("Cycle result: %s", json.dumps(res, ensure_ascii=False))
+            except Exception as e:
+                logger.exception("Cycle failed: %s", e)
+            await asyncio.sleep(interval)
 
 # ---------- main sync ----------
 def main_sync():
-    res = asyncio.run(process_one_article())
+    run = uvloop.run if UVLOOP_AVAILABLE else asyncio.run
+    if HANDLER_LOOP_INTERVAL > 0:
+        try:
+            run(run_forever(HANDLER_LOOP_INTERVAL))
+        except KeyboardInterrupt:
+            logger.info("Handler loop stopped")
+        return None
+    res = run(process_articles())
     print("=== NEWS HANDLER RESULT ===")
     print(json.dumps(res, ensure_ascii=False, indent=2))
     return res
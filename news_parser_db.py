@@ -6,40 +6,48 @@ news_parser_db.py — расширенная, полная версия парс
 - items_xpath выступает исключительно как ЯКОРЬ (anchor). Если anchor не найден — сайт пропускается.
 - title_xpath и date_xpath должны содержать {news_index} — парсер подставляет 1,2,3...
 - Поддерживает режимы:
-    - static: requests + lxml
+    - static: aiohttp + lxml (загрузка, разбор в пуле процессов и запись в БД идут конвейером)
     - selenium: webdriver (поддержка динамики, прокрутки, WebDriverWait)
-- Сохраняет новости в SQLite news.db (с уникальным fingerprint). Не удаляет/не перезаписывает существующие записи.
+    - auto: сначала как static; если страница без браузера не разобралась — как selenium
+- static/auto: условный GET (ETag / Last-Modified); для selenium условный HEAD только с "conditional_head": true
+  (заголовки HTML-оболочки обычно не меняются, когда меняются подгружаемые скриптами карточки)
+- Сохраняет новости в SQLite news.db (ссылка link уникальна). Не удаляет/не перезаписывает существующие записи.
 - Логирование в news_parser.log и вывод результата в parser_run_result.json
 - Отправляет итоговое сообщение в Telegram (TELEGRAM_BOT_TOKEN и TELEGRAM_USER_ID в env).
 """
 
 from __future__ import annotations
 import os
+import re
 import sys
 import json
 import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
 import logging
 import sqlite3
-import hashlib
+from io import BytesIO
+from functools import lru_cache
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from urllib.parse import urljoin
-from typing import Optional, Dict
+from urllib.parse import urljoin, urlsplit, urlunsplit, unquote
+from typing import Optional, Dict, Callable
 
+import aiohttp
 import requests
-from lxml import html
-
-# Selenium optional imports
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from webdriver_manager.chrome import ChromeDriverManager
-    SELENIUM_AVAILABLE = True
-except Exception:
-    SELENIUM_AVAILABLE = False
+from lxml import etree, html
+
+# Selenium — опциональная зависимость, импортируется лениво (_import_selenium) перед запуском первого браузера:
+# static-сайты и сайты, отсечённые условным HEAD, не платят за импорт selenium и webdriver_manager
+SELENIUM_AVAILABLE: Optional[bool] = None  # None — импорт ещё не пробовали
+
+def safe_int(v, default=0):
+    try:
+        return int(v)
+    except Exception:
+        return default
 
 # ----------------- Настройки -----------------
 BASE_DIR = os.getcwd()
@@ -47,17 +55,121 @@ SITES_FILE = os.path.join(BASE_DIR, "sites.json")
 DB_FILE = os.path.join(BASE_DIR, "news.db")
 LOG_FILE = os.path.join(BASE_DIR, "news_parser.log")
 RESULT_JSON = os.path.join(BASE_DIR, "parser_run_result.json")
+DRIVER_PATH_FILE = os.path.join(BASE_DIR, ".driver_path")  # путь к chromedriver с прошлого запуска
 
 # defaults
-DEFAULT_MAX_ITEMS = 200
+# лимит карточек на сайт, если в sites.json не задан свой max_items: обход страницы
+# (и прокрутка в браузере) останавливается, как только набрано столько новостей
+DEFAULT_MAX_ITEMS = max(1, safe_int(os.getenv("PARSER_MAX_ITEMS"), 200))
+STREAM_STOP_MAX_ITEMS = 200  # при меньшем лимите static-страница читается потоково с ранней остановкой
 DEFAULT_CONSECUTIVE_MISS_BREAK = 3
+STATIC_FETCH_TIMEOUT = 20  # seconds - таймаут загрузки static-страницы
+STATIC_CLIENT_TIMEOUT = aiohttp.ClientTimeout(total=STATIC_FETCH_TIMEOUT)
+STREAM_CHUNK_SIZE = 16384  # размер куска при потоковой загрузке static-страницы
+STREAM_STOP_CHECK_EVERY = 4  # признак конца (stop xpath) проверяется раз в столько кусков, а не после каждого
 SELENIUM_WAIT_DEFAULT = 10  # seconds - базовое ожидание загрузки страницы
-SELENIUM_SCROLL_INTERVAL = 1.2  # пауза между прокрутками
-SELENIUM_MAX_SCROLLS = 6  # сколько раз пробуем прокрутить и подождать подгрузки
+SELENIUM_POLL_FREQUENCY = 0.25  # seconds - как часто WebDriverWait проверяет появление якоря
+SELENIUM_MAX_WORKERS = 4  # сколько selenium-сайтов (и браузеров) обрабатываем параллельно
+# JS: пробегает title_xpath/date_xpath по {news_index} и возвращает все карточки разом
+# arguments: title_tpl, date_tpl, max_items, consecutive_miss_break
+# результат: {items: [[idx, title, href, raw_date], ...], missBreak: bool}
+SELENIUM_EXTRACT_SCRIPT = """
+const titleTpl = arguments[0], dateTpl = arguments[1], maxItems = arguments[2], missBreak = arguments[3];
+const first = (xp) => {
+    try {
+        return document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } catch (e) {
+        return null;
+    }
+};
+const text = (n) => ((n.innerText !== undefined ? n.innerText : n.textContent) || '').trim();
+const items = [];
+let miss = 0;
+for (let i = 1; i <= maxItems; i++) {
+    const t = first(titleTpl.split('{news_index}').join(String(i)));
+    if (!t) {
+        miss++;
+        if (miss >= missBreak) { break; }
+        continue;
+    }
+    miss = 0;
+    const el = t.nodeType === Node.ELEMENT_NODE ? t : t.parentElement;
+    let a = null;
+    if (el) {
+        a = el.tagName.toLowerCase() === 'a' ? el : el.querySelector('a[href]');
+        if (!a) { a = el.closest('a[href]'); }
+    }
+    let date = '';
+    if (dateTpl) {
+        const d = first(dateTpl.split('{news_index}').join(String(i)));
+        if (d) { date = text(d); }
+    }
+    items.push([i, text(t), a && a.href ? a.href : null, date]);
+}
+return {items: items, missBreak: miss >= missBreak};
+"""
+# минимальный браузер: без расширений, фоновых запросов Chrome (sync, переводчик, подсказки), звука и дискового кэша
+SELENIUM_CHROME_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-translate",
+    "--mute-audio",
+    "--disable-features=Translate,BackForwardCache,AcceptCHFrame,MediaRouter,OptimizationHints",
+    "--disk-cache-size=0",
+]
+# 2 = block: отключаем загрузку картинок, стилей и шрифтов в браузере
+SELENIUM_CONTENT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.stylesheets": 2,
+    "profile.managed_default_content_settings.fonts": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+# запросы, которые блокируются через CDP: медиа/шрифты и рекламные/аналитические домены
+SELENIUM_BLOCKED_URLS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.woff*", "*.ttf", "*.mp4",
+    "*doubleclick.net*", "*google-analytics*", "*googletagmanager*", "*googlesyndication*",
+    "*adservice*", "*criteo*", "*amazon-adsystem*", "*scorecardresearch*", "*taboola*", "*outbrain*",
+]
+SELENIUM_SETTLE_POLL_MS = 200  # период прокрутки/подсчёта якорей внутри браузера
+SELENIUM_SETTLE_STABLE_TICKS = 3  # сколько тиков подряд число якорей не меняется -> страница догрузилась
+
+# JS: крутит страницу вниз и возвращает число якорей, когда оно перестаёт расти
+# arguments: anchor_xpath, max_count, poll_ms, stable_ticks, callback
+SELENIUM_SETTLE_SCRIPT = """
+const xpath = arguments[0], maxCount = arguments[1], pollMs = arguments[2], stableTicks = arguments[3];
+const done = arguments[arguments.length - 1];
+let prev = -1, stable = 0;
+const timer = setInterval(() => {
+    try {
+        if (document.body) { window.scrollTo(0, document.body.scrollHeight); }
+        const n = document.evaluate('count(' + xpath + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+        if (n === prev) { stable++; } else { stable = 0; prev = n; }
+        if (stable >= stableTicks || n >= maxCount) { clearInterval(timer); done(n); }
+    } catch (e) {
+        clearInterval(timer);
+        done(-1);
+    }
+}, pollMs);
+"""
+
+_SELENIUM_IMPORT_LOCK = threading.Lock()
+_DRIVER_INSTALL_LOCK = threading.Lock()
+_driver_path: Optional[str] = None
+# webdriver_manager: без собственного логирования
+os.environ.setdefault("WDM_LOG", "0")
 
 # ----------------- Логирование -----------------
 logger = logging.getLogger("news_parser")
 logger.setLevel(logging.DEBUG)
+# thread/process-атрибуты записей в формате не используются — не собираем их на каждую запись
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 
 # Файловый лог (чтобы workflow мог взять этот файл как артефакт)
 fh = logging.FileHandler(LOG_FILE, encoding="utf-8")
@@ -77,13 +189,21 @@ class NewsDB:
     def __init__(self, path: str = DB_FILE):
         """
         Подключается к sqlite3 БД (создаёт файл, если не существует).
-        Таблица news имеет уникальный индекс по fingerprint (чтобы не добавлять дубли).
+        Таблица news имеет уникальный индекс по link (чтобы не добавлять дубли).
         """
         self.path = path
         logger.debug(f"Opening DB at: {self.path}")
         # Режимы подключения: если не существует — создаём. Если существует — используем.
-        self.conn = sqlite3.connect(self.path, timeout=30)
+        # Соединение общее для потоков selenium-сайтов, запись сериализуется через self.lock.
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
         self._init_schema()
+        # ссылки, уже лежащие в БД: повторы отсекаются в памяти, до обращения к индексу SQLite.
+        # Старые записи могли сохраниться до normalize_link — кладём и их нормализованный вид.
+        self.known_links = set()
+        for (link,) in self.conn.execute("SELECT link FROM news"):
+            self.known_links.add(link)
+            self.known_links.add(normalize_link(link))
 
     def _init_schema(self):
         cur = self.conn.cursor()
@@ -93,41 +213,108 @@ class NewsDB:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 site TEXT,
                 title TEXT,
-                link TEXT,
+                link TEXT UNIQUE NOT NULL,
                 pub_date TEXT,
                 parsed_date TEXT,
-                fingerprint TEXT UNIQUE,
                 status TEXT DEFAULT 'new'
             )
             """
         )
         # индекс на pub_date чтобы мог сортировать
         cur.execute("CREATE INDEX IF NOT EXISTS idx_news_pub_date ON news(pub_date)")
+        # частичный индекс для выборки обработчика (status='new' ORDER BY pub_date, parsed_date):
+        # отправленные статьи в него не входят, и с ростом архива выборка их не перебирает
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_news_new ON news(pub_date, parsed_date) WHERE status='new'")
+        self._ensure_link_unique(cur)
+        # валидаторы HTTP-кэша (ETag / Last-Modified) последней успешно разобранной страницы сайта
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                site TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT
+            )
+            """
+        )
         self.conn.commit()
 
-    @staticmethod
-    def fingerprint(title: str, link: str) -> str:
-        h = hashlib.sha1()
-        h.update((title + "|" + (link or "")).encode("utf-8"))
-        return h.hexdigest()
-
-    def add_article(self, site: str, title: str, link: str, pub_date: Optional[str]) -> bool:
-        fp = self.fingerprint(title or "", link or "")
-        parsed_date = datetime.utcnow().isoformat()
+    def _ensure_link_unique(self, cur: sqlite3.Cursor):
+        """
+        Миграция старых БД (уникальность была по fingerprint title|link): уникальный индекс по link.
+        Если в старой БД одна ссылка встречается несколько раз, оставляем самую раннюю запись
+        (со статусом posted, если хоть одна из копий уже была отправлена).
+        """
         try:
-            self.conn.execute(
-                "INSERT INTO news (site, title, link, pub_date, parsed_date, fingerprint, status) VALUES (?, ?, ?, ?, ?, ?, 'new')",
-                (site, title, link, pub_date, parsed_date, fp),
-            )
-            self.conn.commit()
-            logger.debug(f"DB: inserted article {site} | {title[:80]}")
-            return True
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_link ON news(link)")
         except sqlite3.IntegrityError:
-            logger.debug(f"DB: duplicate skipped (fingerprint exists) {site} | {title[:80]}")
-            return False
+            logger.warning("DB: duplicate links in legacy table, collapsing them before creating idx_news_link")
+            cur.execute(
+                "UPDATE news SET status='posted' WHERE status != 'posted' "
+                "AND link IN (SELECT link FROM news WHERE status='posted')"
+            )
+            cur.execute("DELETE FROM news WHERE id NOT IN (SELECT MIN(id) FROM news GROUP BY link)")
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_news_link ON news(link)")
+
+    def add_articles(self, site: str, items) -> Optional[int]:
+        """
+        Пакетная вставка списка (title, link, pub_date) одной транзакцией.
+        Дубли (link уже есть) пропускаются. Возвращает число добавленных строк, None — ошибка записи.
+        """
+        # parsed_date одинаков для всей пачки — вычисляем один раз
+        now_iso = datetime.utcnow().isoformat()
+        with self.lock:
+            rows = [
+                (site, title, link, pub_date, now_iso)
+                for title, link, pub_date in items
+                if link not in self.known_links
+            ]
+            if not rows:
+                logger.debug("DB: batch insert %s: 0 new of %d (all links known)", site, len(items))
+                return 0
+            try:
+                with self.conn:
+                    before = self.conn.total_changes
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO news (site, title, link, pub_date, parsed_date) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    added = self.conn.total_changes - before
+            except Exception as e:
+                logger.exception(f"DB: unexpected error on batch insert: {e}")
+                return None
+            self.known_links.update(row[2] for row in rows)
+        logger.debug("DB: batch insert %s: %d new of %d", site, added, len(items))
+        return added
+
+    def get_validators(self, site: str, url: str) -> Dict[str, str]:
+        """
+        Заголовки условного запроса (If-None-Match / If-Modified-Since) для страницы сайта.
+        Пустой dict, если валидаторов нет или url сайта поменялся.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM http_cache WHERE site = ? AND url = ?", (site, url)
+            ).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def save_validators(self, site: str, url: str, etag: Optional[str], last_modified: Optional[str]):
+        try:
+            with self.lock, self.conn:
+                if etag or last_modified:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO http_cache (site, url, etag, last_modified) VALUES (?, ?, ?, ?)",
+                        (site, url, etag, last_modified),
+                    )
+                else:
+                    self.conn.execute("DELETE FROM http_cache WHERE site = ?", (site,))
         except Exception as e:
-            logger.exception(f"DB: unexpected error on insert: {e}")
-            return False
+            logger.debug(f"DB: failed to save http validators for {site}: {e}")
 
     def count(self) -> int:
         cur = self.conn.cursor()
@@ -141,12 +328,6 @@ class NewsDB:
             logger.debug(f"DB close exception: {e}")
 
 # ----------------- Утилиты -----------------
-def safe_int(v, default=0):
-    try:
-        return int(v)
-    except Exception:
-        return default
-
 def normalize_date(raw: Optional[str], site: Optional[str] = None) -> Optional[str]:
     """
     Попытки нормализовать дату: ISO -> return, 'Month Day, Year' -> parse,
@@ -171,7 +352,6 @@ def normalize_date(raw: Optional[str], site: Optional[str] = None) -> Optional[s
     # 3) relative '5 hours ago', '2 minutes ago', 'an hour ago'
     low = s.lower()
     try:
-        import re
         m = re.search(r"(\d+)\s+hour", low)
         if m:
             hours = int(m.group(1))
@@ -189,14 +369,49 @@ def normalize_date(raw: Optional[str], site: Optional[str] = None) -> Optional[s
     # fallback: вернуть строку, чтобы сохранить оригинал (можно декорировать позже)
     return s
 
-def send_telegram(bot_token: str, chat_id: str, text: str) -> bool:
+# query-параметры, которые не меняют статью (трекинг рассылок/соцсетей)
+_TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "sh"}
+
+def normalize_link(link: Optional[str]) -> Optional[str]:
+    """
+    Канонический вид ссылки для дедупликации: схема и хост в нижнем регистре, без #fragment,
+    без utm_* и прочих трекинговых параметров и без завершающего '/' в пути.
+    Остальные query-параметры сохраняются как есть, без перекодирования (у некоторых сайтов в них id статьи):
+    ссылка из БД публикуется и должна вести туда же, куда исходная.
+    """
+    if not link:
+        return link
+    try:
+        p = urlsplit(link.strip())
+    except ValueError:
+        return link
+    query = p.query
+    if query:
+        # выбрасываем трекинговые сегменты "key=value" целиком; оставшиеся не декодируем и не кодируем заново
+        kept = []
+        for segment in query.split("&"):
+            key = unquote(segment.partition("=")[0]).lower()
+            if not key.startswith("utm_") and key not in _TRACKING_PARAMS:
+                kept.append(segment)
+        query = "&".join(kept)
+    path = p.path.rstrip("/") or "/"
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), path, query, ""))
+
+def send_telegram(bot_token: str, chat_id: str, text: str,
+                  session: Optional[requests.Session] = None, parse_mode: Optional[str] = None) -> bool:
+    """
+    Отправляет сообщение в Telegram. Без parse_mode текст уходит как есть (Telegram его не разбирает);
+    session позволяет переиспользовать keep-alive соединение между отправками.
+    """
     if not bot_token or not chat_id:
         logger.warning("Telegram credentials missing -> skip sending")
         return False
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
     try:
-        r = requests.post(url, data=payload, timeout=15)
+        r = (session or requests).post(url, data=payload, timeout=15)
         if r.status_code == 200:
             logger.info("Telegram: message sent")
             return True
@@ -207,6 +422,27 @@ def send_telegram(bot_token: str, chat_id: str, text: str) -> bool:
         logger.exception(f"Telegram send exception: {e}")
         return False
 
+# первый шаг items_xpath с единственным простым условием на @id/@class: //div[@id='x'], //*[contains(@class, 'x')].
+# Условия с not(...), or и т.п. не подходят: значение из них может законно отсутствовать на странице
+_ANCHOR_STEP_RE = re.compile(
+    r"""^\s*/{1,2}[\w*:.-]+\[\s*(?:@(?:id|class)\s*=\s*(['"])([^'"]+)\1"""
+    r"""|contains\(\s*@(?:id|class)\s*,\s*(['"])([^'"]+)\3\s*\))\s*\]"""
+)
+
+def anchor_hint_for_static(cfg: dict) -> Optional[str]:
+    """
+    Подстрока, без которой якорь (items_xpath) на странице заведомо не найдётся:
+    явный anchor_hint из конфига или значение @class/@id из первого шага items_xpath,
+    если это единственное условие шага (вида //*[@id='row-2'] или //h3[contains(@class, 'title')]).
+    None — подсказки нет, проверка не выполняется.
+    """
+    if "anchor_hint" in cfg:
+        return cfg.get("anchor_hint") or None
+    m = _ANCHOR_STEP_RE.match(cfg.get("items_xpath") or "")
+    if not m:
+        return None
+    return m.group(2) or m.group(4)
+
 def anchor_xpath_for_selenium(xpath: str) -> str:
     """
     Если items_xpath содержит /text() на конце — для Selenium лучше убрать /text().
@@ -220,6 +456,322 @@ def anchor_xpath_for_selenium(xpath: str) -> str:
         return s[: s.rfind("/text()")]
     return s
 
+def write_text_atomic(path: str, text: str):
+    """
+    Запись файла через временный файл + os.replace: читатель видит либо старое, либо новое содержимое целиком.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _import_selenium() -> bool:
+    """
+    Импорт selenium/webdriver_manager в глобальные имена модуля при первом обращении.
+    Возвращает SELENIUM_AVAILABLE.
+    """
+    global SELENIUM_AVAILABLE, webdriver, Options, Service, By, WebDriverWait, EC, ChromeDriverManager
+    with _SELENIUM_IMPORT_LOCK:
+        if SELENIUM_AVAILABLE is None:
+            try:
+                from selenium import webdriver
+                from selenium.webdriver.chrome.options import Options
+                from selenium.webdriver.chrome.service import Service
+                from selenium.webdriver.common.by import By
+                from selenium.webdriver.support.ui import WebDriverWait
+                from selenium.webdriver.support import expected_conditions as EC
+                from webdriver_manager.chrome import ChromeDriverManager
+                SELENIUM_AVAILABLE = True
+            except Exception:
+                SELENIUM_AVAILABLE = False
+        return SELENIUM_AVAILABLE
+
+def resolve_chromedriver(refresh: bool = False) -> str:
+    """
+    Путь к chromedriver. ChromeDriverManager().install() ходит в сеть за версией драйвера,
+    поэтому найденный путь запоминаем в процессе и в DRIVER_PATH_FILE и переиспользуем,
+    пока файл драйвера существует. refresh=True — принудительно спросить webdriver_manager.
+    """
+    global _driver_path
+    with _DRIVER_INSTALL_LOCK:
+        if not refresh:
+            if _driver_path and os.path.exists(_driver_path):
+                return _driver_path
+            try:
+                with open(DRIVER_PATH_FILE, "r", encoding="utf-8") as f:
+                    cached = f.read().strip()
+                if cached and os.path.exists(cached):
+                    logger.debug(f"Using cached chromedriver: {cached}")
+                    _driver_path = cached
+                    return cached
+            except OSError:
+                pass
+        _driver_path = ChromeDriverManager().install()
+        try:
+            write_text_atomic(DRIVER_PATH_FILE, _driver_path)
+        except OSError as e:
+            logger.debug(f"Failed to persist chromedriver path: {e}")
+        return _driver_path
+
+# ----------------- Разбор static-страниц (выполняется в пуле процессов) -----------------
+@lru_cache(maxsize=None)
+def _html_parser(encoding: Optional[str] = None):
+    """
+    HTML-парсер lxml (с HtmlElement-узлами) на каждую кодировку: без комментариев и пустых
+    текстовых узлов и без таблицы id (collect_ids=False) — дерево меньше, xpath-обход быстрее.
+    Кодировка из заголовков ответа избавляет lxml от её угадывания.
+    """
+    try:
+        return html.HTMLParser(encoding=encoding, remove_blank_text=True, remove_comments=True, collect_ids=False)
+    except LookupError:
+        # неизвестное имя кодировки в Content-Type — пусть lxml определит сам
+        return _html_parser(None)
+
+@lru_cache(maxsize=4096)
+def _compiled(xpath: str) -> etree.XPath:
+    """
+    Скомпилированный XPath: строки после подстановки {news_index} повторяются между сайтами и запусками,
+    так что разбор выражения выполняется один раз, а не на каждый tree.xpath().
+    """
+    return etree.XPath(xpath)
+
+def _stream_stop_xpath(title_tpl: str, max_items: int):
+    """
+    Скомпилированный xpath заголовка №max_items+1 — признак того, что все нужные карточки
+    уже пришли. None, если шаблон не компилируется (тогда страница читается целиком).
+    """
+    try:
+        return _compiled(title_tpl.format(news_index=max_items + 1))
+    except Exception:
+        return None
+
+def _new_pull_parser(encoding: Optional[str] = None) -> etree.HTMLPullParser:
+    """
+    HTMLPullParser с теми же настройками, что и _html_parser, и с HtmlElement-узлами:
+    построенное им дерево разбирается _extract_from_tree так же, как дерево из etree.parse.
+    """
+    options = dict(events=("start",), tag="html", remove_blank_text=True, remove_comments=True, collect_ids=False)
+    try:
+        parser = etree.HTMLPullParser(encoding=encoding, **options)
+    except LookupError:
+        parser = etree.HTMLPullParser(**options)
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    return parser
+
+def _feed_pull_parser(parser: etree.HTMLPullParser, root, chunk: Optional[bytes], stop_xpath=None):
+    """
+    Скармливает парсеру кусок страницы (None — конец страницы) и, если задан stop_xpath, проверяет его.
+    Выполняется в пуле потоков, а не в event loop. Возвращает (корень дерева или None, найден ли stop_xpath).
+    """
+    if chunk is None:
+        closed = parser.close()
+        return (root if root is not None else closed), False
+    parser.feed(chunk)
+    for _, el in parser.read_events():
+        root = el
+    return root, stop_xpath is not None and root is not None and bool(stop_xpath(root))
+
+async def _read_tree_streaming(resp: aiohttp.ClientResponse, stop_xpath, encoding: Optional[str] = None):
+    """
+    Читает тело ответа кусками и наращивает дерево в HTMLPullParser (в пуле потоков);
+    раз в STREAM_STOP_CHECK_EVERY кусков проверяет stop_xpath и, если узел найден, прекращает загрузку.
+    Возвращает (root, прочитано байт, truncated): дерево потом обходится без повторного разбора.
+    """
+    loop = asyncio.get_running_loop()
+    parser = _new_pull_parser(encoding)
+    root = None
+    size = 0
+    chunks = 0
+    truncated = False
+    async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+        size += len(chunk)
+        chunks += 1
+        check = stop_xpath if chunks % STREAM_STOP_CHECK_EVERY == 0 else None
+        root, truncated = await loop.run_in_executor(None, _feed_pull_parser, parser, root, chunk, check)
+        if truncated:
+            break
+    # закрываем парсер и на обрыве: незакрытые теги частичного дерева будут достроены
+    root, _ = await loop.run_in_executor(None, _feed_pull_parser, parser, root, None)
+    return root, size, truncated
+
+def _extract_items(body: bytes, url: str, items_xpath: str, title_tpl: str, date_tpl: str,
+                   max_items: int, miss_break: int, encoding: Optional[str] = None) -> Dict:
+    """
+    Разбирает HTML и пробегает title_xpath/date_xpath по {news_index}.
+    Функция уровня модуля (нужна для ProcessPoolExecutor), в БД не пишет и не логирует.
+    Возвращает {"anchors": int, "items": [(title, link, pub_date), ...], "miss_break": bool}.
+    """
+    tree = etree.parse(BytesIO(body), _html_parser(encoding)).getroot()
+    return _extract_from_tree(tree, url, items_xpath, title_tpl, date_tpl, max_items, miss_break)
+
+def _extract_from_tree(tree, url: str, items_xpath: str, title_tpl: str, date_tpl: str,
+                       max_items: int, miss_break: int) -> Dict:
+    """
+    Пробегает title_xpath/date_xpath по {news_index} в уже построенном дереве (результат как у _extract_items).
+    """
+    result = {"anchors": 0, "items": [], "miss_break": False}
+    if tree is None:
+        return result
+
+    # anchor search (anchor may return text nodes or elements)
+    anchors = _compiled(items_xpath)(tree)
+    result["anchors"] = len(anchors)
+    if not anchors:
+        return result
+
+    # iterate by index
+    idx = 1
+    consecutive_miss = 0
+    # одна новость часто стоит на странице дважды (лента + "главное"): повторы ссылок отсекаем здесь
+    seen_links = set()
+    while idx <= max_items:
+        title_xpath = title_tpl.format(news_index=idx)
+        date_xpath = date_tpl.format(news_index=idx) if date_tpl else None
+
+        try:
+            t_nodes = _compiled(title_xpath)(tree)
+        except Exception:
+            t_nodes = []
+
+        if not t_nodes:
+            consecutive_miss += 1
+            if consecutive_miss >= miss_break:
+                result["miss_break"] = True
+                break
+            idx += 1
+            continue
+
+        consecutive_miss = 0
+        tnode = t_nodes[0]
+        # title text
+        try:
+            title = tnode.text_content().strip()
+        except Exception:
+            title = str(tnode).strip()
+
+        # link extraction - try node href, or find parent <a>
+        link = None
+        try:
+            if getattr(tnode, "tag", None) == "a" and tnode.get("href"):
+                link = tnode.get("href")
+            else:
+                a = _compiled(".//a")(tnode)
+                if a and hasattr(a[0], "get"):
+                    link = a[0].get("href")
+                else:
+                    parent = tnode.getparent()
+                    while parent is not None:
+                        if parent.tag == "a" and parent.get("href"):
+                            link = parent.get("href")
+                            break
+                        parent = parent.getparent()
+        except Exception:
+            link = None
+
+        if link:
+            link = normalize_link(urljoin(url, link))
+
+        raw_date = ""
+        if date_xpath:
+            try:
+                d_nodes = _compiled(date_xpath)(tree)
+                if d_nodes:
+                    if hasattr(d_nodes[0], "text_content"):
+                        raw_date = d_nodes[0].text_content().strip()
+                    else:
+                        raw_date = str(d_nodes[0]).strip()
+            except Exception:
+                raw_date = ""
+
+        if title and link and link not in seen_links:
+            seen_links.add(link)
+            result["items"].append((title, link, normalize_date(raw_date)))
+
+        idx += 1
+
+    return result
+
+# ----------------- Пул браузеров -----------------
+class ChromeDriverPool:
+    """
+    Пул headless Chrome для selenium-сайтов: запуск браузера (несколько секунд) оплачивается
+    один раз на поток, а не на каждый сайт. Браузеры создаются лениво, при первой нехватке:
+    сайт, отсечённый условным HEAD (304), Chrome не поднимает вовсе.
+    """
+
+    def __init__(self, size: int, factory: Callable[[], Optional[object]]):
+        self.size = max(1, size)
+        self._factory = factory
+        self._idle: queue.Queue = queue.Queue(maxsize=self.size)
+        self._all = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """
+        Выдаёт браузер из пула (или None, если Chrome не запустился). Браузер, на котором
+        вылетело исключение, закрывается и в пул не возвращается.
+        """
+        driver = self._checkout()
+        if driver is None:
+            yield None
+            return
+        try:
+            yield driver
+        except Exception:
+            self._discard(driver)
+            raise
+        self._release(driver)
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = len(self._all) < self.size
+            if can_create:
+                # резервируем место до запуска браузера, чтобы не превысить size
+                self._all.append(None)
+        if not can_create:
+            return self._idle.get()
+        driver = self._factory()
+        with self._lock:
+            self._all.remove(None)
+            if driver is not None:
+                self._all.append(driver)
+        return driver
+
+    def _release(self, driver):
+        try:
+            # пустая страница: следующий сайт не увидит якорей и cookies предыдущего
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except Exception as e:
+            logger.debug(f"Selenium: pooled driver reset failed, dropping it: {e}")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers = [d for d in self._all if d is not None]
+            self._all = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
 # ----------------- Парсер сайтов -----------------
 class NewsParser:
     def __init__(self, sites_file: str = SITES_FILE):
@@ -229,6 +781,7 @@ class NewsParser:
         # Telegram: парсер уведомляет пользователя (TELEGRAM_USER_ID)
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
         self.telegram_user = os.getenv("TELEGRAM_USER_ID", "").strip()
+        self.http = requests.Session()
         self.counters = {
             "found_total": 0,
             "added_total": 0,
@@ -236,6 +789,12 @@ class NewsParser:
             "per_site": {}
         }
         self.errors = []
+        # selenium-сайты обрабатываются в нескольких потоках — счётчики обновляем под замком
+        self._lock = threading.Lock()
+        # mode=auto сайты, которые не удалось разобрать статически
+        self._selenium_fallback = []
+        # браузеры selenium-сайтов; создаётся в run(), если такие сайты есть
+        self._drivers: Optional[ChromeDriverPool] = None
 
     def _load_sites(self) -> Dict:
         if not os.path.exists(self.sites_file):
@@ -250,12 +809,16 @@ class NewsParser:
             logger.exception(f"Failed to load sites.json: {e}")
             return {}
 
-    # ---------------- STATIC (requests + lxml) ----------------
-    def parse_site_static(self, site_name: str, cfg: dict):
+    # ---------------- STATIC (aiohttp + lxml в пуле процессов) ----------------
+    async def parse_site_static(self, site_name: str, cfg: dict, session: aiohttp.ClientSession,
+                                parse_executor: concurrent.futures.Executor, queue: asyncio.Queue) -> bool:
         """
-        Парсинг статических страниц (requests + lxml).
+        Парсинг статических страниц: загрузка через aiohttp, разбор (_extract_items) — в пуле процессов,
+        найденные статьи уходят в очередь писателя (_static_writer).
         items_xpath — anchor (если не найден — пропускаем сайт).
         title_xpath/date_xpath — должны содержать {news_index}.
+        Возвращает False, если страницу не удалось разобрать без браузера
+        (для mode=auto сайт после этого обрабатывается через Selenium).
         """
         logger.info(f"[{site_name}] static parse -> {cfg.get('url')}")
         url = cfg.get("url")
@@ -265,125 +828,151 @@ class NewsParser:
         max_items = safe_int(cfg.get("max_items"), DEFAULT_MAX_ITEMS)
         miss_break = safe_int(cfg.get("consecutive_miss_break"), DEFAULT_CONSECUTIVE_MISS_BREAK)
 
-        # config checks
-        if not items_xpath:
-            msg = f"[{site_name}] CONFIG ERROR: items_xpath is missing"
-            logger.error(msg)
-            self.errors.append(msg)
-            return
-        if "{news_index}" not in title_tpl:
-            msg = f"[{site_name}] CONFIG ERROR: title_xpath must contain '{{news_index}}'."
-            logger.error(msg)
-            self.errors.append(msg)
-            return
+        # при небольшом лимите max_items читаем страницу потоково и обрываем загрузку,
+        # как только в дереве появилась карточка №max_items+1 (хвост страницы не нужен)
+        stop_xpath = _stream_stop_xpath(title_tpl, max_items) if max_items < STREAM_STOP_MAX_ITEMS else None
 
-        # HTTP fetch
+        # HTTP fetch (условный: страница не менялась с прошлого успешного разбора -> 304, разбирать нечего)
         try:
-            resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=20)
-            resp.raise_for_status()
-            tree = html.fromstring(resp.content)
+            async with session.get(url, headers=self.db.get_validators(site_name, url),
+                                   timeout=STATIC_CLIENT_TIMEOUT) as resp:
+                if resp.status == 304:
+                    logger.info(f"[{site_name}] static: page not modified since last run (304), skip")
+                    return True
+                resp.raise_for_status()
+                encoding = resp.charset
+                validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                body = tree = None
+                if stop_xpath is not None:
+                    tree, size, truncated = await _read_tree_streaming(resp, stop_xpath, encoding)
+                    if truncated:
+                        logger.info(f"[{site_name}] static: enough items after {size} bytes, download stopped")
+                else:
+                    body = await resp.read()
         except Exception as e:
-            msg = f"[{site_name}] HTTP fetch error: {e}"
+            return self._static_failed(site_name, cfg, f"[{site_name}] HTTP fetch error: {e}", exc=True)
+
+        # дешёвая проверка до разбора: если значения class/id якоря нет в байтах страницы,
+        # строить дерево бессмысленно (сайт сменил вёрстку или отдал заглушку).
+        # При потоковом чтении дерево уже построено — якорь проверит сам обход
+        anchor_hint = anchor_hint_for_static(cfg)
+        if body is not None and anchor_hint and anchor_hint.encode("utf-8") not in body:
+            msg = f"[{site_name}] Anchor (items_xpath) NOT FOUND on static page (anchor_hint '{anchor_hint}' absent)."
+            return self._static_failed(site_name, cfg, msg)
+
+        # разбор HTML и xpath — CPU-работа, уводим из event loop в пул процессов;
+        # дерево потоково прочитанной страницы в другой процесс не передать — его обходим в пуле потоков
+        loop = asyncio.get_running_loop()
+        try:
+            if body is None:
+                result = await loop.run_in_executor(
+                    None, _extract_from_tree,
+                    tree, url, items_xpath, title_tpl, date_tpl, max_items, miss_break,
+                )
+            else:
+                result = await loop.run_in_executor(
+                    parse_executor, _extract_items,
+                    body, url, items_xpath, title_tpl, date_tpl, max_items, miss_break, encoding,
+                )
+        except Exception as e:
+            return self._static_failed(site_name, cfg, f"[{site_name}] HTML parse error: {e}", exc=True)
+
+        logger.info(f"[{site_name}] anchor search result count (static): {result['anchors']}")
+        if result["anchors"] == 0:
+            return self._static_failed(site_name, cfg, f"[{site_name}] Anchor (items_xpath) NOT FOUND on static page.")
+        if result["miss_break"]:
+            logger.info(f"[{site_name}] static: break after {miss_break} consecutive misses")
+        if not result["items"] and cfg.get("mode") == "auto":
+            # якорь есть, а карточек нет — список, видимо, дорисовывается скриптами
+            return self._static_failed(site_name, cfg, f"[{site_name}] No items in static HTML.")
+
+        # валидаторы сохранит писатель, и только после успешной записи статей:
+        # иначе следующий запуск получит 304 и несохранённые статьи потеряются
+        await queue.put((site_name, result["items"], url, validators))
+        return True
+
+    def _static_failed(self, site_name: str, cfg: dict, msg: str, exc: bool = False) -> bool:
+        """
+        Неудачный static-разбор. Для mode=auto это не ошибка запуска: сайт уйдёт в Selenium (см. run()).
+        Всегда возвращает False.
+        """
+        if cfg.get("mode") == "auto":
+            logger.warning(f"{msg} -> falling back to selenium")
+            return False
+        if exc:
             logger.exception(msg)
-            self.errors.append(msg)
-            return
-
-        # anchor search (anchor may return text nodes or elements)
-        anchors = tree.xpath(items_xpath)
-        logger.info(f"[{site_name}] anchor search result count (static): {len(anchors)}")
-        if len(anchors) == 0:
-            msg = f"[{site_name}] Anchor (items_xpath) NOT FOUND on static page."
+        else:
             logger.error(msg)
-            self.errors.append(msg)
-            return
-
-        # iterate by index
-        idx = 1
-        consecutive_miss = 0
-        while idx <= max_items:
-            title_xpath = title_tpl.format(news_index=idx)
-            date_xpath = date_tpl.format(news_index=idx) if date_tpl else None
-
-            try:
-                t_nodes = tree.xpath(title_xpath)
-            except Exception as e:
-                logger.debug(f"[{site_name}] invalid title xpath at idx {idx}: {e}")
-                consecutive_miss += 1
-                if consecutive_miss >= miss_break:
-                    break
-                idx += 1
-                continue
-
-            if not t_nodes:
-                logger.debug(f"[{site_name}] static: no title at idx {idx}")
-                consecutive_miss += 1
-                if consecutive_miss >= miss_break:
-                    logger.info(f"[{site_name}] static: break after {miss_break} consecutive misses")
-                    break
-                idx += 1
-                continue
-
-            consecutive_miss = 0
-            tnode = t_nodes[0]
-            # title text
-            try:
-                title = tnode.text_content().strip()
-            except Exception:
-                title = str(tnode).strip()
-
-            # link extraction - try node href, or find parent <a>
-            link = None
-            try:
-                if getattr(tnode, "tag", None) == "a" and tnode.get("href"):
-                    link = tnode.get("href")
-                else:
-                    a = tnode.xpath(".//a")
-                    if a and hasattr(a[0], "get"):
-                        link = a[0].get("href")
-                    else:
-                        parent = tnode.getparent()
-                        while parent is not None:
-                            if parent.tag == "a" and parent.get("href"):
-                                link = parent.get("href")
-                                break
-                            parent = parent.getparent()
-            except Exception:
-                link = None
+        self.errors.append(msg)
+        return False
 
-            if link:
-                link = urljoin(url, link)
+    async def _static_writer(self, queue: asyncio.Queue):
+        """
+        Единственный писатель в SQLite для static-сайтов: забирает пачки статей из очереди
+        и вставляет каждую одной транзакцией. None в очереди — сигнал завершения.
+        """
+        while True:
+            job = await queue.get()
+            if job is None:
+                break
+            site_name, items, url, validators = job
+            if self._store_items(site_name, items, "static"):
+                self.db.save_validators(site_name, url, *validators)
 
-            raw_date = ""
-            if date_xpath:
+    def _store_items(self, site_name: str, items, mode: str) -> bool:
+        """
+        Сохраняет найденные статьи сайта одной пачкой и обновляет счётчики.
+        Возвращает False, если записать статьи не удалось.
+        """
+        added = self.db.add_articles(site_name, items)
+        if added is None:
+            msg = f"[{site_name}] {mode}: failed to store {len(items)} items"
+            logger.error(msg)
+            self.errors.append(msg)
+            return False
+        dups = len(items) - added
+        with self._lock:
+            self.counters["found_total"] += len(items)
+            self.counters["added_total"] += added
+            self.counters["duplicates"] += dups
+            if added:
+                self.counters["per_site"][site_name] = self.counters["per_site"].get(site_name, 0) + added
+        logger.info("[%s] %s: %d items => NEW: %d, DUP: %d", site_name, mode, len(items), added, dups)
+        return True
+
+    async def _run_static(self, sites: Dict[str, dict]):
+        """
+        Конвейер для static-сайтов: загрузка (async I/O) -> разбор (пул процессов) -> запись (одна задача).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        workers = max(1, min(len(sites), os.cpu_count() or 1))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as parse_executor:
+            async with aiohttp.ClientSession(headers={"User-Agent": "Mozilla/5.0"}) as session:
+                writer = asyncio.create_task(self._static_writer(queue))
                 try:
-                    d_nodes = tree.xpath(date_xpath)
-                    if d_nodes:
-                        if hasattr(d_nodes[0], "text_content"):
-                            raw_date = d_nodes[0].text_content().strip()
-                        else:
-                            raw_date = str(d_nodes[0]).strip()
-                except Exception:
-                    raw_date = ""
-
-            pub_date = normalize_date(raw_date, site_name)
-
-            if title and link:
-                added = self.db.add_article(site_name, title, link, pub_date)
-                self.counters["found_total"] += 1
-                if added:
-                    self.counters["added_total"] += 1
-                    self.counters["per_site"][site_name] = self.counters["per_site"].get(site_name, 0) + 1
-                else:
-                    self.counters["duplicates"] += 1
-                logger.info(f"[{site_name}] static #{idx} => {'NEW' if added else 'DUP'}: {title[:80]}")
-            else:
-                logger.debug(f"[{site_name}] static skip idx {idx} (title/link missing)")
-
-            idx += 1
+                    await asyncio.gather(*(
+                        self._guarded_static(site_name, cfg, session, parse_executor, queue)
+                        for site_name, cfg in sites.items()
+                    ))
+                finally:
+                    await queue.put(None)
+                    await writer
+
+    async def _guarded_static(self, site_name: str, cfg: dict, session: aiohttp.ClientSession,
+                              parse_executor: concurrent.futures.Executor, queue: asyncio.Queue):
+        logger.info(f"=== Processing site: {site_name} ===")
+        try:
+            ok = await self.parse_site_static(site_name, cfg, session, parse_executor, queue)
+        except Exception as e:
+            logger.exception(f"[{site_name}] top-level error: {e}")
+            self.errors.append(f"{site_name} top error: {e}")
+            return
+        if not ok and cfg.get("mode") == "auto":
+            self._selenium_fallback.append(site_name)
 
     # ---------------- SELENIUM (dynamic) ----------------
     def _setup_selenium(self):
-        if not SELENIUM_AVAILABLE:
+        if not _import_selenium():
             logger.error("Selenium modules not available (import failed).")
             return None
         try:
@@ -393,12 +982,28 @@ class NewsParser:
                 options.add_argument("--headless=new")
             except Exception:
                 options.add_argument("--headless")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
+            for arg in SELENIUM_CHROME_ARGS:
+                options.add_argument(arg)
+            # парсеру нужен только DOM и текст: картинки, стили и шрифты не грузим
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_experimental_option("prefs", SELENIUM_CONTENT_PREFS)
+            # driver.get() возвращается сразу после начала навигации; готовность страницы
+            # определяет явное ожидание якоря (WebDriverWait) и settle-скрипт, а не реклама и трекеры
+            options.page_load_strategy = "none"
+            driver_path = resolve_chromedriver()
+            try:
+                driver = webdriver.Chrome(service=Service(driver_path), options=options)
+            except Exception as e:
+                # закэшированный драйвер мог не подойти к обновившемуся Chrome — резолвим заново
+                logger.warning(f"Chrome start with cached driver {driver_path} failed ({e}), re-resolving driver")
+                driver_path = resolve_chromedriver(refresh=True)
+                driver = webdriver.Chrome(service=Service(driver_path), options=options)
             driver.set_page_load_timeout(60)
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": SELENIUM_BLOCKED_URLS})
+            except Exception as e:
+                logger.debug(f"CDP URL blocking not applied: {e}")
             return driver
         except Exception as e:
             logger.exception(f"Selenium driver init failed: {e}")
@@ -408,8 +1013,8 @@ class NewsParser:
         """
         Парсинг через Selenium:
         - ждём появления anchor (items_xpath без /text())
-        - делаем автопрокрутку до SELENIUM_MAX_SCROLLS для подгрузки lazy-load
-        - затем пробегаем title_xpath с {news_index}
+        - прокручиваем страницу в браузере, пока число якорей растёт (lazy-load)
+        - затем одним execute_script пробегаем title_xpath с {news_index}
         """
         logger.info(f"[{site_name}] selenium parse -> {cfg.get('url')}")
         url = cfg.get("url")
@@ -420,179 +1025,133 @@ class NewsParser:
         miss_break = safe_int(cfg.get("consecutive_miss_break"), DEFAULT_CONSECUTIVE_MISS_BREAK)
         wait = safe_int(cfg.get("wait"), SELENIUM_WAIT_DEFAULT)
 
-        if not items_xpath_raw:
-            msg = f"[{site_name}] CONFIG ERROR: items_xpath missing (selenium)"
-            logger.error(msg)
-            self.errors.append(msg)
-            return
-        if "{news_index}" not in title_tpl:
-            msg = f"[{site_name}] CONFIG ERROR: title_xpath must contain '{{news_index}}' (selenium)"
-            logger.error(msg)
-            self.errors.append(msg)
+        # дешёвый условный HEAD: если страница не менялась с прошлого успешного разбора, браузер не поднимаем.
+        # Только по явному "conditional_head": карточки обычно дорисовывают скрипты, а ETag/Last-Modified
+        # относятся к HTML-оболочке — по ним сайт со свежими новостями мог бы пропускаться бесконечно
+        validators = (None, None)
+        if cfg.get("conditional_head"):
+            try:
+                head = self.http.head(url, headers={"User-Agent": "Mozilla/5.0", **self.db.get_validators(site_name, url)},
+                                      timeout=5, allow_redirects=True)
+                if head.status_code == 304:
+                    logger.info(f"[{site_name}] Selenium: page not modified since last run (304), skip")
+                    return
+                if head.ok:
+                    validators = (head.headers.get("ETag"), head.headers.get("Last-Modified"))
+            except Exception as e:
+                logger.debug(f"[{site_name}] Selenium: HEAD pre-check failed: {e}")
+
+        with self._drivers.acquire() as driver:
+            if not driver:
+                msg = f"[{site_name}] Selenium driver not available"
+                logger.error(msg)
+                self.errors.append(msg)
+                return
+            extracted = self._selenium_extract(site_name, driver, url, items_xpath_raw, title_tpl, date_tpl,
+                                               max_items, miss_break, wait)
+        if extracted is None:
             return
 
-        # create driver
-        driver = self._setup_selenium()
-        if not driver:
-            msg = f"[{site_name}] Selenium driver not available"
-            logger.error(msg)
-            self.errors.append(msg)
-            return
+        items = []
+        seen_links = set()
+        for idx, title, link, raw_date in extracted.get("items") or []:
+            if link:
+                link = normalize_link(urljoin(url, link))
+            pub_date = normalize_date(raw_date, site_name)
+            if title and link in seen_links:
+                logger.debug("[%s] selenium skip idx %d (same link as an earlier card)", site_name, idx)
+            elif title and link:
+                seen_links.add(link)
+                items.append((title, link, pub_date))
+                logger.debug("[%s] selenium #%d: %.80s", site_name, idx, title)
+            else:
+                logger.debug("[%s] selenium skip idx %d (title/link missing)", site_name, idx)
+        if extracted.get("missBreak"):
+            logger.info("[%s] Selenium: reached %d consecutive misses — stop", site_name, miss_break)
+
+        if self._store_items(site_name, items, "selenium") and items:
+            self.db.save_validators(site_name, url, *validators)
 
+    def _selenium_extract(self, site_name: str, driver, url: str, items_xpath_raw: str, title_tpl: str,
+                          date_tpl: str, max_items: int, miss_break: int, wait: int) -> Optional[dict]:
+        """
+        Работа с браузером из пула: загрузка страницы, ожидание якоря, прокрутка и извлечение карточек.
+        None — страницу открыть не удалось.
+        """
         anchor_xpath = anchor_xpath_for_selenium(items_xpath_raw)
+        # локатор якоря собираем один раз: он нужен и в ожидании, и в запасном подсчёте
+        anchor_locator = (By.XPATH, anchor_xpath)
 
         try:
             driver.get(url)
         except Exception as e:
             logger.exception(f"[{site_name}] Selenium navigation to URL failed: {e}")
-            try:
-                driver.quit()
-            except Exception:
-                pass
             self.errors.append(f"{site_name} nav error: {e}")
-            return
+            return None
 
         logger.info(f"[{site_name}] Selenium: waiting up to {wait}s for anchor presence (anchor_xpath: {anchor_xpath})")
         try:
-            WebDriverWait(driver, wait).until(EC.presence_of_all_elements_located((By.XPATH, anchor_xpath)))
+            WebDriverWait(driver, wait, poll_frequency=SELENIUM_POLL_FREQUENCY).until(EC.presence_of_all_elements_located(anchor_locator))
         except Exception as e:
             # несмотря на ожидание, попробуем всё же найти элементы, но логируем ошибку
             logger.warning(f"[{site_name}] Selenium: anchor not found within {wait}s: {e}")
 
-        # try to gather anchors and do a few scrolls to load lazy content
+        # прокрутка и ожидание "успокоения" DOM выполняются в браузере одним вызовом:
+        # скрипт крутит страницу и завершается, когда число якорей перестаёт расти
+        # (или достигнут max_items), вместо фиксированных пауз на стороне драйвера
         try:
-            anchors = driver.find_elements(By.XPATH, anchor_xpath)
-            logger.info(f"[{site_name}] Selenium: initial anchors count: {len(anchors)}")
-            if len(anchors) == 0:
-                # возможно xpath указывает на текст node -> пусто. Но всё равно пробуем продолжить и проверять title_xpath
-                logger.warning(f"[{site_name}] Selenium: anchor count is 0 — will still attempt per-index parsing (maybe anchor is text() node).")
+            driver.set_script_timeout(wait + 3)
+            anchors_count = driver.execute_async_script(
+                SELENIUM_SETTLE_SCRIPT, anchor_xpath, max_items,
+                SELENIUM_SETTLE_POLL_MS, SELENIUM_SETTLE_STABLE_TICKS,
+            )
+            anchors_count = safe_int(anchors_count, 0)
         except Exception as e:
-            logger.warning(f"[{site_name}] Selenium: anchors search failed: {e}")
-            anchors = []
-
-        # try progressive scroll to load more items (if page lazy-loads)
-        prev_anchor_count = len(anchors)
-        scroll_count = 0
-        while scroll_count < SELENIUM_MAX_SCROLLS:
-            # scroll to bottom
-            try:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            except Exception:
-                pass
-            time.sleep(SELENIUM_SCROLL_INTERVAL)
+            logger.warning(f"[{site_name}] Selenium: settle script failed: {e}")
             try:
-                anchors = driver.find_elements(By.XPATH, anchor_xpath)
-                curr = len(anchors)
-                logger.debug(f"[{site_name}] Selenium scroll {scroll_count+1}: anchors now {curr}")
-                if curr > prev_anchor_count:
-                    prev_anchor_count = curr
-                    # continue scrolling if new anchors appeared
-                else:
-                    # no increase -> maybe content loaded fully
-                    break
+                anchors_count = len(driver.find_elements(*anchor_locator))
             except Exception:
-                break
-            scroll_count += 1
-
-        logger.info(f"[{site_name}] Selenium: final anchors count after scrolls: {len(anchors)} (scrolls: {scroll_count})")
-
-        # Now iterate indices
-        idx = 1
-        consecutive_miss = 0
-        while idx <= max_items:
-            title_xpath = title_tpl.format(news_index=idx)
-            date_xpath = date_tpl.format(news_index=idx) if date_tpl else None
-            logger.debug(f"[{site_name}] Selenium: checking idx={idx} title_xpath={title_xpath}")
-
-            try:
-                title_elems = driver.find_elements(By.XPATH, title_xpath)
-            except Exception as e:
-                logger.debug(f"[{site_name}] Selenium invalid title xpath at idx {idx}: {e}")
-                consecutive_miss += 1
-                if consecutive_miss >= miss_break:
-                    logger.info(f"[{site_name}] Selenium: stopping after {miss_break} consecutive invalid/missing title xpaths")
-                    break
-                idx += 1
-                continue
-
-            if not title_elems:
-                logger.debug(f"[{site_name}] Selenium: no title at idx {idx}")
-                consecutive_miss += 1
-                if consecutive_miss >= miss_break:
-                    logger.info(f"[{site_name}] Selenium: reached {miss_break} consecutive misses — stop")
-                    break
-                idx += 1
-                continue
+                anchors_count = 0
 
-            # found title element(s)
-            consecutive_miss = 0
-            te = title_elems[0]
-            try:
-                title = te.text.strip()
-            except Exception:
-                title = ""
+        logger.info(f"[{site_name}] Selenium: anchors count after settle: {anchors_count}")
+        if anchors_count <= 0:
+            # возможно xpath указывает на текст node -> пусто. Но всё равно пробуем продолжить и проверять title_xpath
+            logger.warning(f"[{site_name}] Selenium: anchor count is 0 — will still attempt per-index parsing (maybe anchor is text() node).")
 
-            # link extraction
-            link = None
-            try:
-                if te.tag_name.lower() == "a":
-                    link = te.get_attribute("href")
-                else:
-                    a = te.find_elements(By.XPATH, ".//a")
-                    if a:
-                        link = a[0].get_attribute("href")
-                    else:
-                        # climb up parents to find enclosing <a>
-                        parent = te
-                        for climb in range(6):
-                            try:
-                                parent = parent.find_element(By.XPATH, "..")
-                            except Exception:
-                                parent = None
-                            if parent is None:
-                                break
-                            try:
-                                if parent.tag_name.lower() == "a":
-                                    link = parent.get_attribute("href")
-                                    break
-                            except Exception:
-                                pass
-            except Exception:
-                link = None
-
-            if link:
-                link = urljoin(url, link)
-
-            # date extraction
-            raw_date = ""
-            if date_xpath:
-                try:
-                    date_elems = driver.find_elements(By.XPATH, date_xpath)
-                    if date_elems:
-                        raw_date = date_elems[0].text.strip()
-                except Exception:
-                    raw_date = ""
-
-            pub_date = normalize_date(raw_date, site_name)
-
-            if title and link:
-                added = self.db.add_article(site_name, title, link, pub_date)
-                self.counters["found_total"] += 1
-                if added:
-                    self.counters["added_total"] += 1
-                    self.counters["per_site"][site_name] = self.counters["per_site"].get(site_name, 0) + 1
-                else:
-                    self.counters["duplicates"] += 1
-                logger.info(f"[{site_name}] selenium #{idx} => {'NEW' if added else 'DUP'}: {title[:80]}")
-            else:
-                logger.debug(f"[{site_name}] selenium skip idx {idx} (title/link missing)")
+        # все карточки извлекаем одним execute_script: обход индексов, текст, ссылка и дата
+        # считаются в браузере, вместо нескольких WebDriver-запросов на каждую карточку
+        try:
+            extracted = driver.execute_script(SELENIUM_EXTRACT_SCRIPT, title_tpl, date_tpl or "", max_items, miss_break)
+        except Exception as e:
+            msg = f"[{site_name}] Selenium: extraction script failed: {e}"
+            logger.exception(msg)
+            self.errors.append(msg)
+            extracted = {"items": [], "missBreak": False}
+        return extracted
 
-            idx += 1
+    def _check_site_config(self, site_name: str, cfg: dict) -> bool:
+        """
+        Общая для всех режимов проверка конфига сайта (до выбора static/selenium).
+        """
+        if not cfg.get("items_xpath"):
+            msg = f"[{site_name}] CONFIG ERROR: items_xpath is missing"
+            logger.error(msg)
+            self.errors.append(msg)
+            return False
+        if "{news_index}" not in cfg.get("title_xpath", ""):
+            msg = f"[{site_name}] CONFIG ERROR: title_xpath must contain '{{news_index}}'."
+            logger.error(msg)
+            self.errors.append(msg)
+            return False
+        return True
 
+    def _parse_one_selenium(self, site_name: str, cfg: dict):
+        logger.info(f"=== Processing site: {site_name} ===")
         try:
-            driver.quit()
-        except Exception:
-            pass
+            self.parse_site_selenium(site_name, cfg)
+        except Exception as e:
+            logger.exception(f"[{site_name}] top-level error: {e}")
+            self.errors.append(f"{site_name} top error: {e}")
 
     # ----------------- RUN ALL -----------------
     def run(self):
@@ -602,28 +1161,49 @@ class NewsParser:
             logger.error(msg)
             return self._finalize(start_ts)
 
+        static_sites: Dict[str, dict] = {}
+        selenium_sites: Dict[str, dict] = {}
         for site_name, cfg in self.sites.items():
-            logger.info(f"=== Processing site: {site_name} ===")
+            # fill defaults if not present
+            cfg = dict(cfg)
+            if "max_items" not in cfg:
+                cfg["max_items"] = DEFAULT_MAX_ITEMS
+            if "consecutive_miss_break" not in cfg:
+                cfg["consecutive_miss_break"] = DEFAULT_CONSECUTIVE_MISS_BREAK
+
+            if not self._check_site_config(site_name, cfg):
+                continue
+
+            mode = cfg.get("mode", "selenium")
+            if mode in ("static", "auto"):
+                # auto: сначала дешёвый HTTP + lxml, Selenium — только если без браузера не вышло
+                static_sites[site_name] = cfg
+            elif mode == "selenium":
+                selenium_sites[site_name] = cfg
+            else:
+                msg = f"[{site_name}] Unknown parsing mode: {mode}"
+                logger.error(msg)
+                self.errors.append(msg)
+
+        if static_sites:
             try:
-                # fill defaults if not present
-                cfg = dict(cfg)
-                if "max_items" not in cfg:
-                    cfg["max_items"] = DEFAULT_MAX_ITEMS
-                if "consecutive_miss_break" not in cfg:
-                    cfg["consecutive_miss_break"] = DEFAULT_CONSECUTIVE_MISS_BREAK
-
-                mode = cfg.get("mode", "selenium")
-                if mode == "static":
-                    self.parse_site_static(site_name, cfg)
-                elif mode == "selenium":
-                    self.parse_site_selenium(site_name, cfg)
-                else:
-                    msg = f"[{site_name}] Unknown parsing mode: {mode}"
-                    logger.error(msg)
-                    self.errors.append(msg)
+                asyncio.run(self._run_static(static_sites))
             except Exception as e:
-                logger.exception(f"[{site_name}] top-level error: {e}")
-                self.errors.append(f"{site_name} top error: {e}")
+                logger.exception(f"Static pipeline error: {e}")
+                self.errors.append(f"static pipeline error: {e}")
+            for site_name in self._selenium_fallback:
+                selenium_sites[site_name] = static_sites[site_name]
+
+        if selenium_sites:
+            # по браузеру из пула на поток; потоки простаивают на RPC к chromedriver, так что GIL не мешает
+            workers = min(SELENIUM_MAX_WORKERS, len(selenium_sites))
+            self._drivers = ChromeDriverPool(workers, self._setup_selenium)
+            try:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
+                    list(ex.map(lambda kv: self._parse_one_selenium(*kv), selenium_sites.items()))
+            finally:
+                self._drivers.close()
+                self._drivers = None
 
         return self._finalize(start_ts)
 
@@ -636,7 +1216,7 @@ class NewsParser:
 
         # Message format — первым показываем число новых новостей (как просили)
         lines = []
-        lines.append(f"🚀 {added} новостей — <b>Парсинг завершён</b>")
+        lines.append(f"🚀 {added} новостей — Парсинг завершён")
         lines.append(datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"))
         lines.append(f"Время работы скрипта: {elapsed} сек.")
         lines.append(f"Новые новости: {added}")
@@ -646,14 +1226,15 @@ class NewsParser:
         lines.append(f"ВСЕГО: {found} (дубликатов: {dups})")
         if self.errors:
             lines.append("")
-            lines.append("<b>Ошибки парсинга:</b>")
+            lines.append("Ошибки парсинга:")
             for e in self.errors:
                 lines.append(f"- {e}")
 
         telegram_sent = False
         if self.telegram_token and self.telegram_user:
             text = "\n".join(lines)
-            telegram_sent = send_telegram(self.telegram_token, self.telegram_user, text)
+            # текст без разметки: parse_mode не нужен, и "<" в текстах ошибок не ломает отправку
+            telegram_sent = send_telegram(self.telegram_token, self.telegram_user, text, session=self.http)
         else:
             logger.warning("TELEGRAM_BOT_TOKEN or TELEGRAM_USER_ID not set -> skip telegram send")
             # errors list kept for debug
@@ -670,8 +1251,9 @@ class NewsParser:
 
         # write JSON result for Actions to parse
         try:
-            with open(RESULT_JSON, "w", encoding="utf-8") as fh:
-                json.dump(result, fh, ensure_ascii=False, indent=2)
+            # одна строка -> одна запись (json.dump пишет в файл мелкими кусками), через временный файл:
+            # при падении посреди записи старый результат остаётся целым
+            write_text_atomic(RESULT_JSON, json.dumps(result, ensure_ascii=False, indent=2))
             logger.info(f"Wrote run result to {RESULT_JSON}")
         except Exception as e:
             logger.exception(f"Failed to write result JSON: {e}")
@@ -687,6 +1269,7 @@ def main():
         parser.db.close()
     except Exception:
         pass
+    parser.http.close()
     logger.info("Parser finished.")
     # For CLI convenience print short JSON to stdout
     print(json.dumps(res, ensure_ascii=False, indent=2))